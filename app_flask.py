@@ -1,49 +1,71 @@
-# app_flask.py
+# app_flask.py - Flask backend for Movie Recommendation App (Render-compatible)
 from flask import Flask, request, jsonify
 from recommender.model import MovieRecommender
 import threading
+import traceback
 import os
+import sys
 
-app = Flask(__name__)
-
-# Global variable for the recommender (lazy loaded)
-recommender = None
-load_lock = threading.Lock()
-
-def get_recommender():
-    """Lazily load the recommender model (only once)."""
-    global recommender
-    if recommender is None:
-        with load_lock:
-            if recommender is None:  # Double-check (thread-safe)
-                print("🔄 Loading recommender model...")
-                recommender = MovieRecommender("data/movies.csv", "data/credits.csv")
-                print("✅ Recommender model loaded.")
-    return recommender
-
-@app.route("/", methods=["GET"])
-def home():
-    return "🎬 Movie Recommender API is running!", 200
-
-@app.route("/recommend", methods=["POST"])
-def recommend():
-    data = request.get_json() or {}
-    movie = data.get("movie", "").strip()
-
-    if not movie:
-        return jsonify({"error": "Missing 'movie' field"}), 400
-
-    try:
-        recs = get_recommender().recommend(movie)
-        return jsonify({"recommendations": recs})
-    except Exception as e:
-        print(f"❌ Error while recommending: {e}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route("/health")
-def health():
-    return "OK", 200
+MOVIES_PATH = "data/movies.csv"
+CREDITS_PATH = "data/credits.csv"
 
+
+def create_app(movies_path=MOVIES_PATH, credits_path=CREDITS_PATH):
+    """Build the Flask app; the recommender is loaded lazily on first use."""
+    app = Flask(__name__)
+
+    # --- Lazy load the recommender model (only once, thread-safe) ---
+    recommender = None
+    load_lock = threading.Lock()
+
+    def get_recommender():
+        nonlocal recommender
+        if recommender is None:
+            with load_lock:
+                if recommender is None:  # Double-check (thread-safe)
+                    print("🧠 Loading Movie Recommender model...")
+                    try:
+                        recommender = MovieRecommender(movies_path, credits_path)
+                        print("✅ Model loaded successfully.")
+                    except Exception as e:
+                        print("❌ Failed to load model:", e)
+                        traceback.print_exc(file=sys.stdout)
+                        raise
+        return recommender
+
+    # --- Health check route (for Render) ---
+    @app.route("/health")
+    def health():
+        return "OK", 200
+
+    # --- Main recommendation API ---
+    @app.route("/recommend", methods=["POST"])
+    def recommend():
+        try:
+            data = request.get_json(force=True, silent=True)
+            movie = data.get("movie") if isinstance(data, dict) else None
+            if not isinstance(movie, str) or not movie.strip():
+                return jsonify({"error": "No movie title provided."}), 400
+            movie = movie.strip()
+
+            recommendations = get_recommender().recommend(movie)
+            return jsonify({"recommendations": recommendations}), 200
+
+        except Exception as e:
+            print("🔥 ERROR:", e)
+            traceback.print_exc(file=sys.stdout)
+            return jsonify({"error": str(e)}), 500
+
+    # --- Root route (optional simple message) ---
+    @app.route("/")
+    def home():
+        return jsonify({"message": "Movie Recommender API is running!"}), 200
+
+    return app
+
+
+# --- App startup (Render detects port via $PORT env var) ---
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
+    print(f"🚀 Starting Flask app on port {port}")
+    create_app().run(host="0.0.0.0", port=port)
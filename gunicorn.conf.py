@@ -0,0 +1,20 @@
+# gunicorn.conf.py - Gunicorn settings for the Flask backend (Render-compatible)
+import multiprocessing
+import os
+
+# Render provides the port via $PORT
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# A few sync-style workers, each with threads so requests overlap model work
+workers = min(4, multiprocessing.cpu_count() * 2 + 1)
+worker_class = "gthread"
+threads = 4
+
+# Import the app once in the master. Each worker still loads the recommender
+# lazily; model memory is shared only through the memory-mapped on-disk cache,
+# which a file lock ensures is built by just one worker.
+preload_app = True
+
+# Building the model on first request can take a while
+timeout = 120
+
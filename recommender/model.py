@@ -1,69 +1,265 @@
-import pandas as pd
-import numpy as np
 import ast
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import bisect
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock
+    fcntl = None
+
+# pandas, numpy and scikit-learn are imported inside the methods that use them so that importing
+# this module (e.g. to serve /health) stays cheap until the model is built.
+
+# Stringified TMDB lists may use JSON ("name": "...") or Python repr quoting, which is
+# 'name': '...' or, for names containing an apostrophe, 'name': "...".
+# Captures are escape-aware (e.g. \" or \u00e9) and decoded by _unescape.
+NAME_RE = re.compile(
+    r'"name":\s*"((?:[^"\\]|\\.)*)"'
+    r'|\'name\':\s*\'((?:[^\'\\]|\\.)*)\''
+    r'|\'name\':\s*"((?:[^"\\]|\\.)*)"'
+)
+
+# Bump whenever the prepared data changes shape or meaning (tags, merge, df columns)
+# so caches written by older code are not picked up.
+CACHE_VERSION = 4
+# HashingVectorizer settings (dtype is float32); part of the cache key as well.
+VECTORIZER_PARAMS = {"n_features": 4096, "stop_words": "english", "alternate_sign": False, "norm": "l2"}
+
+# Only the columns _prepare actually reads.
+MOVIES_DTYPES = {"id": "int32", "title": "string", "genres": "string", "keywords": "string"}
+CREDITS_DTYPES = {"movie_id": "int32", "title": "string", "cast": "string", "crew": "string"}
+
+
+def _read_csv(path, dtypes):
+    """Read whichever of the given columns exist, using pyarrow when it is installed."""
+    import pandas as pd
+
+    header = set(pd.read_csv(path, nrows=0).columns)
+    dtypes = {col: dtype for col, dtype in dtypes.items() if col in header}
+    engine = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+    return pd.read_csv(path, usecols=list(dtypes), dtype=dtypes, engine=engine)
+
+
+def _merge_datasets(movies, credits):
+    """Join movies and credits on TMDB ids when present, otherwise on title."""
+    missing = ({"title", "genres", "keywords"} - set(movies.columns)) | (
+        {"cast", "crew"} - set(credits.columns)
+    )
+    if missing:
+        raise ValueError(f"Unsupported CSV schema: missing columns {sorted(missing)}")
+
+    if "id" in movies.columns and "movie_id" in credits.columns:
+        credits = credits.drop(columns=["title"], errors="ignore")
+        return movies.merge(credits, left_on="id", right_on="movie_id", validate="one_to_one")
+    if "title" in credits.columns:
+        return movies.merge(credits, on="title")
+    raise ValueError("Unsupported CSV schema: no 'id'/'movie_id' or shared 'title' column to merge on")
+
+
+def _unescape(json_body, py_single, py_double):
+    """Decode the string literal body captured by NAME_RE."""
+    if "\\" in json_body:
+        return json.loads(f'"{json_body}"')
+    if "\\" in py_single:
+        return ast.literal_eval(f"'{py_single}'")
+    if "\\" in py_double:
+        return ast.literal_eval(f'"{py_double}"')
+    return json_body or py_single or py_double
+
+
+def _names(text):
+    """All 'name' fields of a stringified TMDB list."""
+    return [_unescape(*m) for m in NAME_RE.findall(text)] if isinstance(text, str) else []
+
+
+def _iter_tags(df):
+    """Yield each movie's tag string, built in a single pass over the rows."""
+    for row in df.itertuples(index=False):
+        parts = _names(row.cast)
+        parts.extend(_names(row.crew))
+        parts.extend(_names(row.keywords))
+        parts.extend(_names(row.genres))
+        yield " ".join(parts).lower()
+
 
 class MovieRecommender:
-    def __init__(self, movies_path, credits_path):
+    def __init__(self, movies_path, credits_path, cache_dir=None):
         self.movies_path = movies_path
         self.credits_path = credits_path
+        self.cache_dir = cache_dir or os.environ.get(
+            "RECOMMENDER_CACHE_DIR", os.path.join(os.path.dirname(movies_path), "cache")
+        )
         self.df = None
-        self.cosine_sim = None
-        self._prepare()
+        self.vectors = None
+        self.title_index = {}
+        self._titles_blob = ""
+        self._title_offsets = []
+        self.cache_path = self._cache_path()
+        if not self._load_cache():
+            # Only one process (e.g. gunicorn worker) builds; the rest wait and load its cache.
+            with self._build_lock():
+                if not self._load_cache():
+                    self._prepare()
+                    # Re-open what was just written memory-mapped, so the vectors live in the
+                    # shared page cache rather than in this process's heap.
+                    if self._save_cache():
+                        self._load_cache(quiet=True)
+        self._build_index()
+        # Popular titles are requested repeatedly; memoize per instance.
+        self._rec_cache = functools.lru_cache(maxsize=1024)(self._recommend_impl)
+
+    def _cache_path(self):
+        """Cache file for the prepared model, keyed on the CSV contents and model settings."""
+        digest = hashlib.sha1(repr(sorted(VECTORIZER_PARAMS.items())).encode())
+        for path in (self.movies_path, self.credits_path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        return os.path.join(self.cache_dir, f"model-v{CACHE_VERSION}-{digest.hexdigest()[:16]}.joblib")
+
+    @contextlib.contextmanager
+    def _build_lock(self):
+        """Hold an exclusive file lock next to the cache file while building."""
+        if fcntl is None:
+            yield
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            lock_file = open(f"{self.cache_path}.lock", "w")
+        except OSError as e:
+            print("⚠️ Building without a cache lock:", e)
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_cache(self, quiet=False):
+        """Load prepared data from disk; vectors are memory-mapped read-only."""
+        import joblib
+
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            data = joblib.load(self.cache_path, mmap_mode="r")
+            df, vectors = data["df"], data["vectors"]
+            if (
+                data.get("version") != CACHE_VERSION
+                or "title" not in df.columns
+                or vectors.shape != (len(df), VECTORIZER_PARAMS["n_features"])
+            ):
+                raise ValueError("cached model does not match the current format")
+        except Exception as e:
+            print("⚠️ Ignoring unreadable model cache:", e)
+            return False
+        self.df = df
+        self.vectors = vectors
+        if not quiet:
+            print("✅ Loaded prepared model from cache.")
+        return True
+
+    def _save_cache(self):
+        """Persist prepared data so later boots can skip _prepare."""
+        import joblib
 
-    def _safe_ast(self, text):
-        """Safely parse stringified lists (from CSVs)."""
         try:
-            if isinstance(text, str) and text.strip():
-                return ast.literal_eval(text)
-        except Exception:
-            return []
-        return []
-
-    def _get_names_from_list(self, data):
-        """Extract 'name' fields from list of dicts."""
-        if isinstance(data, list):
-            return [d.get("name", "") for d in data if isinstance(d, dict)]
-        return []
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            joblib.dump({"version": CACHE_VERSION, "df": self.df, "vectors": self.vectors}, tmp_path)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print("⚠️ Could not write model cache:", e)
+            return False
+        return True
 
     def _prepare(self):
         """Load and prepare movie data (optimized for small memory)."""
+        import numpy as np
+        from sklearn.feature_extraction.text import HashingVectorizer
+
         print("📂 Loading datasets...")
-        movies = pd.read_csv(self.movies_path)
-        credits = pd.read_csv(self.credits_path)
+        movies = _read_csv(self.movies_path, MOVIES_DTYPES)
+        credits = _read_csv(self.credits_path, CREDITS_DTYPES)
 
         print("🔗 Merging datasets...")
-        df = movies.merge(credits, on="title")
+        df = _merge_datasets(movies, credits)
 
         print("🧹 Cleaning and processing data...")
         # Use only a subset to stay within memory limits
         df = df.head(5000)
 
-        df["cast_list"] = df["cast"].apply(lambda x: self._get_names_from_list(self._safe_ast(x)))
-        df["crew_list"] = df["crew"].apply(lambda x: self._get_names_from_list(self._safe_ast(x)))
-        df["keywords_list"] = df["keywords"].apply(lambda x: self._get_names_from_list(self._safe_ast(x)))
-        df["genres_list"] = df["genres"].apply(lambda x: self._get_names_from_list(self._safe_ast(x)))
+        print("📊 Vectorizing text data...")
+        # Stateless hashing: no vocabulary to fit or keep in memory. Rows come out
+        # sparse and L2-normalized, so a sparse dot product is the cosine similarity.
+        hv = HashingVectorizer(dtype=np.float32, **VECTORIZER_PARAMS)
+        self.vectors = hv.transform(_iter_tags(df))
+        # recommend() only needs titles; drop the raw JSON blobs
+        self.df = df[["title"]].reset_index(drop=True)
+        print("✅ Data prepared successfully.")
 
-        df["tags"] = df["cast_list"] + df["crew_list"] + df["keywords_list"] + df["genres_list"]
-        df["tags"] = df["tags"].apply(lambda x: " ".join(x))
+    def _build_index(self):
+        """Build the lookup structures used by recommend()."""
+        # Lowercased title -> row position; keep the first row for duplicate titles.
+        self.title_index = {}
+        titles_lower = []
+        for i, title in enumerate(self.df["title"].astype(str)):
+            title_lower = title.lower()
+            titles_lower.append(title_lower)
+            self.title_index.setdefault(title_lower, i)
 
-        print("📊 Vectorizing text data...")
-        cv = CountVectorizer(max_features=5000, stop_words="english")
-        vectors = cv.fit_transform(df["tags"]).toarray()
+        # All titles joined by newlines plus each row's start offset, so partial
+        # matches are one str.find over the blob and a bisect back to the row.
+        self._titles_blob = "\n".join(titles_lower)
+        self._title_offsets = []
+        offset = 0
+        for title_lower in titles_lower:
+            self._title_offsets.append(offset)
+            offset += len(title_lower) + 1
 
-        print("🧮 Calculating similarity matrix...")
-        self.cosine_sim = cosine_similarity(vectors)
-        self.df = df.reset_index(drop=True)
-        print("✅ Data prepared successfully.")
+    def _find_partial(self, movie_title_lower):
+        """Row of the first title containing the query, or None."""
+        if not movie_title_lower or "\n" in movie_title_lower:
+            return None
+        pos = self._titles_blob.find(movie_title_lower)
+        if pos < 0:
+            return None
+        return bisect.bisect_right(self._title_offsets, pos) - 1
 
-    def recommend(self, movie_title):
+    def recommend(self, movie_title, top_n=5):
         """Recommend similar movies."""
-        if movie_title not in self.df["title"].values:
+        recommendations = self._rec_cache(movie_title.strip().lower(), top_n)
+        if recommendations is None:
             raise ValueError(f"Movie '{movie_title}' not found in dataset.")
+        return list(recommendations)
+
+    def _recommend_impl(self, movie_title_lower, top_n):
+        """Uncached recommendation lookup for a normalized title (None if not found)."""
+        import numpy as np
+
+        idx = self.title_index.get(movie_title_lower)
+        if idx is None:
+            # Fall back to the first title containing the query.
+            idx = self._find_partial(movie_title_lower)
+        if idx is None:
+            return None
+
+        # Rows are unit-length, so one sparse mat-vec product gives cosine scores
+        scores = (self.vectors @ self.vectors[idx].T).toarray().ravel()
 
-        idx = self.df[self.df["title"] == movie_title].index[0]
-        distances = list(enumerate(self.cosine_sim[idx]))
-        movies_sorted = sorted(distances, key=lambda x: x[1], reverse=True)[1:6]
-        recommendations = [self.df.iloc[i[0]].title for i in movies_sorted]
-        return recommendations
+        # Exclude the query movie up front so exactly top_n survive the partition
+        scores[idx] = -np.inf
+        k = min(top_n, scores.size - 1)
+        if k <= 0:
+            return ()
+        top_idx = np.argpartition(-scores, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-scores[top_idx])]
+        return tuple(self.df["title"].to_numpy()[top_idx].tolist())